@@ -7,12 +7,17 @@
 
 #### relevant packages ###
 
+import math
 import numpy as np
-import scipy.interpolate
 import scipy.signal
+from scipy.fft import rfft, next_fast_len
+from numba import njit
 import pyaudio 
+import threading
 import time
 import tkinter as tk
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg #necessary for TkInter GUI
 
 ######################################################
 
@@ -26,14 +31,20 @@ root.title("Guitar Tuner") # title
 def save_input():
     # attempt to save the input as a float
     try:
-        samplingtime = float(entry.get()) # seconds
-        print("Input saved:", samplingtime)
+        newtime = float(entry.get()) # seconds
+        # nan and inf cannot be turned into a number of samples
+        # and we need at least one chunk of samples to analyze
+        if not math.isfinite(newtime) or newtime * samplespersec < samplesize:
+            raise ValueError
+        # everything that depends on the length of the recording has to be recomputed
+        set_sampling_parameters(newtime)
     # if the input cannot be converted, print error to console
-    except ValueError:
+    except (ValueError, OverflowError, MemoryError):
         print("Invalid input")
+        return
+    print("Input saved:", samplingtime)
 
 # length of sampling window, in seconds
-samplingtime = tk.StringVar()
 samplingtime = 4  #in case no sampling time is entered
 
 # create the input box
@@ -54,10 +65,166 @@ samplesize = 2048
 # sampling rate, how many samples will be taken per second, determined from PyAudio forum
 samplespersec = 48000 
 
-totalsamples = samplespersec * samplingtime
+# limit frequencies to detectable range
+lowestfreq = 80 # Hz, around threshold of lowest note on a guitar
+highestfreq = 1200 # Hz, around highest note a guitar could play
 
-# convert frequency domain to Hz (will be used later)
-freqconversion = samplespersec/samplesize
+# highest frequency shown on the spectrum plot
+highestplotfreq = 1000 # Hz
+
+# reference pitch for converting frequencies to cents
+A_4 = 440.0 # Hz, Western tuning convention that pitch measured against
+_LOG2_A4 = math.log2(A_4)
+_CENTS_PER_OCTAVE = 12.0 # 1200 cents / 100 cents per half step
+
+# everything below only depends on how long we sample for
+# so it is computed once here instead of on every sampling
+# every value is worked out first and only then saved to the globals,
+# so if anything fails the old sampling time stays fully in effect
+def set_sampling_parameters(newtime):
+    global samplingtime, nframes, nfft, freqconversion, _SCRATCH_WINDOWED, _WINDOW, _PLOT_HI, _FREQS_PLOT, _TIME_AXIS, _I1, _I2
+
+    # number of frames to read from the microphone, must be an int
+    newnframes = int(samplespersec * newtime)
+
+    # the fft is much faster on lengths with only small prime factors
+    # so zero-pad the recording up to the next such length
+    newnfft = next_fast_len(newnframes, real=True)
+
+    # convert frequency domain to Hz (will be used later)
+    newfreqconversion = samplespersec/newnfft
+
+    # buffer that every sampling writes the recording times the window into, instead of allocating a new array
+    scratch = np.empty(newnframes, dtype=np.float32)
+
+    # in signal processing it is a good idea to smooth out the ends of the data set
+    # this protects against discontinuities
+    # the hamming window is the most common choice in signal processing
+    # stored as float32 so that it does not promote the float32 audio data
+    window = scipy.signal.windows.hamming(newnframes).astype(np.float32)
+
+    # frequency (Hz) of each bin returned by rfft that is shown on the spectrum plot
+    # bins above highestplotfreq would be off screen anyway, so they are not plotted
+    plothi = int(highestplotfreq/newfreqconversion) + 1
+    freqsplot = np.arange(plothi) * newfreqconversion
+
+    # time axis for plotting the raw audio data
+    timeaxis = np.linspace(0, newtime, newnframes)
+
+    # first and last indices of the spectrum that fall strictly inside the detectable range
+    # (i*freqconversion > lowestfreq and i*freqconversion < highestfreq)
+    i1 = int(np.floor(lowestfreq/newfreqconversion)) + 1
+    i2 = int(np.ceil(highestfreq/newfreqconversion)) - 1
+
+    samplingtime, nframes, nfft, freqconversion = newtime, newnframes, newnfft, newfreqconversion
+    _SCRATCH_WINDOWED, _WINDOW, _PLOT_HI, _FREQS_PLOT, _TIME_AXIS, _I1, _I2 = scratch, window, plothi, freqsplot, timeaxis, i1, i2
+
+set_sampling_parameters(samplingtime)
+
+######################################################
+
+### Audio Stream ###
+
+# one PyAudio instance for the whole session
+# opening a new stream on every sampling is slow, so the stream is opened once and reused
+_PA = pyaudio.PyAudio()
+_STREAM = None
+
+def get_stream():
+    # open the audio data from microphone the first time it is needed
+    # this syntax I retrieved from the PyAudio documentation: https://people.csail.mit.edu/hubert/pyaudio/docs/#class-pyaudio-stream
+    global _STREAM
+    if _STREAM is None:
+        _STREAM = _PA.open(format = pyaudio.paFloat32, # 32 bit float is data type, already normalized
+                           channels = 1, 
+                           rate = samplespersec, 
+                           frames_per_buffer = samplesize, 
+                           input = True,
+                           start = False) # only record while sampling
+    return _STREAM
+
+######################################################
+
+### Peak Finding ###
+
+# the fft itself stays in scipy (numba cannot compile np.fft)
+# everything after it is a small loop over the spectrum, so compile it with numba
+# the signatures are given explicitly so numba compiles them when the program starts
+# (and caches them), instead of pausing the first sampling to compile
+# the spectrum is complex64, so its real and imaginary parts are float32 arrays
+@njit("float64(float32[:], float32[:], int64)", cache=True)
+def _power(freqspec_real, freqspec_imag, i):
+    # squared absolute value of the spectrum at bin i
+    # squaring keeps the same order as the absolute value, so the peak is the same bin
+    # and it saves a square root per bin
+    # done in float64 even though the spectrum itself is float32
+    return float(freqspec_real[i])**2 + float(freqspec_imag[i])**2
+
+@njit("Tuple((int64, float64, float64, float64))(float32[:], float32[:], int64, int64)", cache=True)
+def _find_peak(freqspec_real, freqspec_imag, i1, i2):
+    # isolate the frequency with the peak intensity, searching in the acceptable range
+    # i1 and i2 are the first and last bins inside it, so i2 is searched too
+    # the intensities are worked out bin by bin inside the loop
+    # so no array of intensities is made, only the 3 near the peak are kept
+    bestindex = i1
+    bestpower = -1.0
+    for i in range(i1, i2 + 1):
+        power = _power(freqspec_real, freqspec_imag, i)
+        if power > bestpower:
+            bestpower = power
+            bestindex = i
+
+    # a silent recording has no intensity anywhere in the range, so there is no peak at all
+    # this is marked with a bin index of -1
+    if bestpower <= 0.0:
+        return -1, 0.0, 0.0, 0.0
+
+    # if the peak is on either end of the acceptable range, one of its neighbours is outside it
+    # so it is not a real peak of the range and interpolating would pull it out of the range
+    # equal values give a flat line, so the peak bin itself is used
+    if bestindex == i1 or bestindex >= i2:
+        return bestindex, 0.0, 0.0, 0.0
+
+    # the log of a neighbour with no intensity at all is -inf, so nothing can be interpolated
+    power0 = _power(freqspec_real, freqspec_imag, bestindex - 1)
+    power2 = _power(freqspec_real, freqspec_imag, bestindex + 1)
+    if power0 <= 0.0 or power2 <= 0.0:
+        return bestindex, 0.0, 0.0, 0.0
+
+    # tuner must respond to log of intensities -> sound detection of human ear
+    # log|z| = 0.5 * log|z|^2
+    y0 = 0.5 * math.log(power0)
+    y1 = 0.5 * math.log(bestpower)
+    y2 = 0.5 * math.log(power2)
+    return bestindex, y0, y1, y2
+
+@njit("float64(float64, float64, float64)", cache=True)
+def _quad_vertex(y0, y1, y2):
+    # the peak of the quadratic through 3 evenly spaced points is at its vertex
+    # offset of the vertex from the middle point:
+    # delta = (y0 - y2) / (2 * (y0 - 2*y1 + y2))
+    curvature = y0 - 2*y1 + y2
+    if curvature >= 0:
+        # the middle point is not a maximum (or the 3 points are on a line)
+        # so there is no better estimate than the middle point itself
+        return 0.0
+    # the peak can only be between the outer 2 points
+    delta = 0.5 * (y0 - y2) / curvature
+    return min(max(delta, -1.0), 1.0)
+
+@njit("float64(float32[:], float32[:], int64, int64, float64)", cache=True)
+def _analyze(freqspec_real, freqspec_imag, i1, i2, freqconversion):
+    # note that the true frequency we're looking for is likely not exactly at the peak bin
+    # use an interpolation around the peak intensity to determine the best freq
+    # start by collecting 3 log intensities near peak
+    bestindex, y0, y1, y2 = _find_peak(freqspec_real, freqspec_imag, i1, i2)
+    # no peak was found (silence), so there is no frequency either
+    if bestindex < 0:
+        return math.nan
+    peakindex = bestindex + _quad_vertex(y0, y1, y2)
+
+    # now we convert the index of best frequency to actual frequency
+    return peakindex * freqconversion # Hz
 
 ######################################################
 
@@ -69,36 +236,26 @@ def take_audio():
     print("Detecting Audio...")
     t0 = time.perf_counter()
 
-    # open the audio data from microphone
-    # this syntax I retrieved from the PyAudio documentation: https://people.csail.mit.edu/hubert/pyaudio/docs/#class-pyaudio-stream
-    p = pyaudio.PyAudio()
-    audiostream = p.open(format = pyaudio.paInt16, # 16 bit integer is data type
-                                 channels = 1, 
-                                 rate = samplespersec, 
-                                 frames_per_buffer = samplesize, 
-                                 input = True)
+    audiostream = get_stream()
+    audiostream.start_stream()
 
-    # wait for microphone to collect enough data
-    time.sleep(samplingtime)
+    # extract data from audio stream
+    # read blocks until the microphone has collected all samplingtime seconds of data
+    try:
+        raw = audiostream.read(nframes,exception_on_overflow=False)
+    finally:
+        # pause stream until the next sampling, even if the read failed
+        audiostream.stop_stream()
 
     # print how long the sampling occurred for
     t = time.perf_counter() - t0
     print("Sampled %.3f seconds of microphone data" % t)
 
-    # extract data from audio stream
-    numdatapoints = totalsamples//samplesize # must be an int
-    data = audiostream.read(samplesize,exception_on_overflow=False)[:int(totalsamples)]
-
-    # close stream
-    audiostream.close()
-
-    # the data is saved as a byte string, so convert to 16-bit integer
+    # the data is saved as a byte string, so view it as 32-bit floats
     # frombuffer used because fromstring does not handle unicode inputs
-    data = np.frombuffer(data,dtype=np.int16)
-
-    # convert the 16 bit integers into floats
-    # also normalize the floats to range from 0.0 to 1.0
-    data = data / (2**15)
+    # PyAudio already delivers the samples normalized to range from -1.0 to 1.0
+    # float32 is plenty for microphone audio and keeps the fft in single precision
+    data = np.frombuffer(raw,dtype=np.float32)
 
     #############################################################
 
@@ -106,50 +263,24 @@ def take_audio():
 
     # now  the audio data is in floats
     # we can use a fourier transform to analyze the frequency spectrum of the data
-    freqspec = np.fft.fft(data)
-
-    # in signal processing it is a good idea to smooth out the ends of the data set
-    # this protects against discontinuities
-    # the hamming window is the most common choice in signal processing
-    window = scipy.signal.hamming(samplesize)
+    # the hamming window is applied to the recording itself, before the transform
+    # the data is real, so rfft only returns the non-redundant half of the spectrum
+    # (nfft//2 + 1 bins, which still covers everything up to 1200 Hz)
+    np.multiply(data, _WINDOW, out=_SCRATCH_WINDOWED)
+    freqspec = rfft(_SCRATCH_WINDOWED, n=nfft)
 
     # take absolute value to get intensity as a function of frequency
-    smoothedspec = np.abs(freqspec * window)
-
-    # limit frequencies to detectable range
-    lowestfreq = 80 # Hz, around threshold of lowest note on a guitar
-    highestfreq = 1200 # Hz, around highest note a guitar could play
-    # create an list of indices for the smoothedspec that fall in this range
-    goodindices = [i for i in range(len(smoothedspec)) if i*freqconversion > lowestfreq and i*freqconversion < highestfreq]
-    # create first and last indices
-    i1, i2 = goodindices[0], goodindices[-1] 
-
-    # now we isolate the frequency with the peak intensity, searching in the acceptable range
-    # add i1 so that bestindex corresponds to an index in entire smoothedspec array
-    bestindex = smoothedspec[i1:i2].argmax() + i1
-
-    # note that the true frequency we're looking for is likely not exactly at this point
-    # use an interpolation around the peak intensity to determine the best freq
-    # start by collecting 3 intensities near peak
-    xvalues = [i for i in range(bestindex -1, bestindex + 2,1)]
-    intensities_nearpeak = [smoothedspec[i] for i in xvalues]
-    # tuner must respond to log of intensities -> sound detection of human ear
-    yvalues = np.log(intensities_nearpeak)
-
-    # create an interpolation function
-    interpolation = scipy.interpolate.interp1d(xvalues,yvalues,kind='quadratic')
-    # find the peak of the interpolation in this this range
-    xrange = np.linspace(xvalues[0],xvalues[2],10000)
-    yrange = interpolation(xrange)
-    peakindex = xrange[yrange.argmax()]
+    # only needed for the part of the spectrum that is plotted
+    # the peak search below works on the spectrum directly
+    smoothedspec = np.abs(freqspec[:_PLOT_HI])
 
-    # now we convert the index of best frequency to actual frequency
-    bestfreq = peakindex * freqconversion # Hz
+    # find the peak frequency from the spectrum
+    bestfreq = _analyze(freqspec.real, freqspec.imag, _I1, _I2, freqconversion) # Hz
     
-    rawfreqstatement = "The peak frequency detected was %.1f Hz" % bestfreq
-    # print out the text for the raw frequency in a TkInter label
-    rawfreq_label.config(text=rawfreqstatement)
-
+    if math.isnan(bestfreq):
+        rawfreqstatement = "No sound was detected"
+    else:
+        rawfreqstatement = "The peak frequency detected was %.1f Hz" % bestfreq
     print(rawfreqstatement)
     
     # we have the frequency of the pitch we're looking for
@@ -158,48 +289,57 @@ def take_audio():
 
     # to find the note, we convert the frequency to cents, 1/100 of a half-step
     # cents conversion (found here: http://hyperphysics.phy-astr.gsu.edu/hbase/Music/cents.html)
-    A_4 = 440 # Hz, Western tuning convention that pitch measured against
-    distancefromA4_cents = 1200 * np.log2(A_4/bestfreq)/100
+    # 1200 cents per octave, 100 cents per half step -> 12 half steps per octave
+    # bestfreq is a plain float, so use math.log2 rather than the numpy ufunc
+    # for a silent recording bestfreq is nan, which math.log2 passes through
+    # and checknote reports as an unidentified note
+    distancefromA4_cents = _CENTS_PER_OCTAVE * (_LOG2_A4 - math.log2(bestfreq))
     # now we have how far from A_4 our pitch is in steps
     # to find which note it is, take modulo of distance from octave
-    cents = distancefromA4_cents % 12
+    # (python's % keeps the result in [0, 12) for pitches above A_4 too, unlike math.fmod)
+    cents = distancefromA4_cents % _CENTS_PER_OCTAVE
     
-    return cents, smoothedspec, data
+    return rawfreqstatement, cents, smoothedspec, data
 
 
 #################################################################
 
 ### Create Function to Create Graphics ###
 
+# make plots of the data 
+# the figure and TkInter canvas are built once and their lines are updated on every sampling
+f1 , (_AX1, _AX2) = plt.subplots(2)
+
+# raw audio data
+_LINE1, = _AX1.plot([],[])
+_AX1.set_xlabel("Recording Time (s)")
+_AX1.set_ylabel("Normalized Sound Amplitude")
+_AX1.set_title("Raw Audio Data")
+
+# frequency spectrum
+_LINE2, = _AX2.plot([],[])
+_AX2.set_xlim(0,highestplotfreq) #Hz
+_AX2.set_xlabel("Frequency (Hz)")
+_AX2.set_ylabel("Relative Intensity")
+_AX2.set_title("Frequency Spectrum")
+f1.subplots_adjust(hspace=1)
+
+# plot in GUI
+# TkInter canvas widget to display the plot, packed the first time there is something to show
+_CANVAS = FigureCanvasTkAgg(f1, master=root)
+
 def produce_graphics(smoothedspec, data):
-    # make plots of the data 
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg #necessary for TkInter GUI
-
-    # raw audio data
-    x = np.linspace(0,samplingtime,samplesize)
-    f1 , (ax1, ax2) = plt.subplots(2)
-    ax1.plot(x,data)
-    ax1.set_xlabel("Recording Time (s)")
-    ax1.set_ylabel("Normalized Sound Amplitude")
-    ax1.set_title("Raw Audio Data")
-    
-      # frequency spectrum
-    freqs = np.arange(0,(len(smoothedspec)))*freqconversion
-    ax2.plot(freqs,smoothedspec)
-    ax2.set_xlim(0,1000) #Hz
-    ax2.set_xlabel("Frequency (Hz)")
-    ax2.set_ylabel("Relative Intensity")
-    ax2.set_title("Frequency Spectrum")
-    f1.subplots_adjust(hspace=1)
+    # swap in the new data and rescale the axes to fit it
+    _LINE1.set_data(_TIME_AXIS,data)
+    _AX1.relim()
+    _AX1.autoscale_view()
 
-    # plot in GUI
+    _LINE2.set_data(_FREQS_PLOT,smoothedspec)
+    _AX2.relim()
+    _AX2.autoscale_view(scalex=False) # keep the 0-highestplotfreq range
 
-    # now create TkInter canvas widget to display the plot
-    canvas1 = FigureCanvasTkAgg(f1, master=root)
-    canvas1.draw()
-    canvas1.get_tk_widget().pack()
-    canvas_list.append(canvas1)
+    _CANVAS.draw_idle()
+    _CANVAS.get_tk_widget().pack()
 
 
 #################################################################
@@ -207,19 +347,14 @@ def produce_graphics(smoothedspec, data):
 ### Determine Note ####
 
 # compare the best frequency in cents with the values for each note on scale
-A1 = 0 #tuning frequency
-A2 = 12
-# Asharp is11 half steps away, modulo of cent value would be 11
-B = 10 #10 half steps away...
-# C = 9, but only use values corresponding to strings on a guitar
-#Csharp = 8
-D = 7
-#Dsharp = 6
-E = 5
-#F = 4
-#Fsharp = 3
-G = 2
-#Gsharp = 1
+# only use values corresponding to strings on a guitar
+# A is the tuning frequency, 0 half steps away
+# Asharp is 11 half steps away, modulo of cent value would be 11
+# B is 10 half steps away...
+# C = 9, Csharp = 8, D = 7, Dsharp = 6, E = 5, F = 4, Fsharp = 3, G = 2, Gsharp = 1
+# A is listed twice, in case the cents value is between 11 and 12
+_NOTE_NAMES = np.array(["A", "B", "D", "E", "G", "A"])
+_NOTE_CENTS = np.array([0, 10, 7, 5, 2, 12], dtype=np.float64)
 
 
 # create function to check every single possible note
@@ -239,88 +374,80 @@ def checknote(cents):
     and returns a string declaring what note it is and how in tune
     the note was."""
     
-    # check A
-    if abs(cents - A1) < 1.2: 
-        note = "A"
-        if np.abs(cents - A1) < 0.2:
-            status = intune()
-        elif (cents - A1) < 0:
-            status = sharpstatus()
-        elif (cents - A1) > 0:
-            status = flatstatus()
-    # need to check A twice, in case the cents value is between 11 and 12
-    if abs(cents - A2) < 1.2: 
-        note = "A"
-        if np.abs(cents - A2) < 0.2:
+    # distance from every note at once, then pick the closest one
+    distances = cents - _NOTE_CENTS
+    k = np.argmin(np.abs(distances))
+    delta = distances[k]
+
+    if abs(delta) < 1.2:
+        note = str(_NOTE_NAMES[k])
+        if abs(delta) < 0.2:
             status = intune()
-        elif (cents - A2) < 0:
+        elif delta < 0:
             status = sharpstatus()
-        elif (cents - A2) > 0:
+        else:
             status = flatstatus()
-
-    # B 
-    elif abs(cents - B) < 1.2:
-        note = "B"
-        if np.abs(cents - B) < 0.2:
-            status = intune()
-        elif (cents - B) < 0:
-            status = sharpstatus()
-        elif (cents - B) > 0:
-            status = flatstatus()
-
-    # D
-    elif abs(cents - D) < 1.2:
-        note = "D"
-        if np.abs(cents - D) < 0.2:
-            status = intune()
-        elif (cents - D) < 0:
-            status = sharpstatus()
-        elif (cents - D) > 0:
-            status = flatstatus()
-
-    # E
-    elif abs(cents - E) < 1.2:
-        note = "E"
-        if np.abs(cents - E) < 0.2:
-            status = intune()
-        elif (cents - E) < 0:
-            status = sharpstatus()
-        elif (cents - E) > 0:
-            status = flatstatus()
-
-    # G
-    elif abs(cents - G) < 1.2:
-        note = "G"
-        if np.abs(cents - G) < 0.2:
-            status = intune()
-        elif (cents - G) < 0:
-            status = sharpstatus()
-        elif (cents - G) > 0:
-            status = flatstatus()
-
     else:
         note = "an unidentified note"
         status = "something went wrong! Please try again."
 
 
     outcome = "You played " + note + " and " + status
-    result_label.config(text = outcome)
     return outcome
 
 #################################################################
 
 ### Define function to do all steps ###
-def tuner():
-    cents, spec, data = take_audio()
-    print(checknote(cents))
+
+# recording blocks for samplingtime seconds, so it runs on a worker thread
+# to keep the window responsive. TkInter (and the TkAgg plots) are not
+# thread safe, so the results are handed back to the main loop with root.after
+def _tuner_worker():
+    try:
+        rawfreqstatement, cents, spec, data = take_audio()
+        outcome = checknote(cents)
+        print(outcome)
+        root.after(0, lambda: _show_results(rawfreqstatement, outcome, spec, data))
+    # if anything goes wrong, print it to console and tell the user instead of dying silently
+    except Exception as error:
+        print("Sampling failed:", error)
+        root.after(0, _show_error)
+    # whatever happened, allow sampling again
+    finally:
+        root.after(0, _enable_buttons)
+
+def _show_results(rawfreqstatement, outcome, spec, data):
+    # print out the text for the raw frequency, note and intonation in TkInter labels
+    rawfreq_label.config(text=rawfreqstatement)
+    result_label.config(text=outcome)
     produce_graphics(spec, data)
 
+def _show_error():
+    rawfreq_label.config(text='')
+    result_label.config(text="Sampling failed, something went wrong! Please try again.")
 
-### Graphical interface for the button and results ###
+def _enable_buttons():
+    # allow sampling and changing the sampling time again
+    button.config(state=tk.NORMAL)
+    button1.config(state=tk.NORMAL)
+
+# the thread doing the current sampling, if any
+_WORKER = None
+
+def tuner():
+    global _WORKER
+    # no new sampling once the window is being closed
+    if _closing:
+        return
+    # only one sampling at a time, since they share the microphone stream
+    # and the sampling time cannot change while the worker is using it
+    button.config(state=tk.DISABLED)
+    button1.config(state=tk.DISABLED)
+    _WORKER = threading.Thread(target=_tuner_worker, daemon=True)
+    _WORKER.start()
 
-# create list of canvases that our plot will be added to
-# this will be used to clear out plots when resampling
-canvas_list = []
+
+### Graphical interface for the button and results ###
 
 # create button to launch program
 button = tk.Button(root, text="Begin Sampling", command=tuner)
@@ -335,16 +462,40 @@ result_label = tk.Label(root, text='')
 result_label.pack()
 
 
-# fxn to clear widgets
+# fxn to clear the plots
 def clear_plots():
-    # reference empty list made earlier, appended to in graphics function
-    for canvas in canvas_list:
-        canvas.get_tk_widget().pack_forget()
-    # Clear the canvas list
-    canvas_list.clear()
+    # empty the lines and hide the canvas until the next sampling
+    _LINE1.set_data([],[])
+    _LINE2.set_data([],[])
+    _CANVAS.draw_idle()
+    _CANVAS.get_tk_widget().pack_forget()
 
 #button to clear canvases
 clear_button = tk.Button(root, text="Clear Plots", command=clear_plots)
 clear_button.pack()
 
+# fxn to release the microphone when the window is closed
+_closing = False
+
+def close_tuner():
+    global _closing
+    # only start closing once, even if the window is closed again while waiting
+    if not _closing:
+        _closing = True
+        _finish_closing()
+
+def _finish_closing():
+    # a sampling may still be reading from the stream on the worker thread
+    # closing the stream under it can crash PortAudio, so check back until it is done
+    # (joining here would block the main loop the worker hands its results to)
+    if _WORKER is not None and _WORKER.is_alive():
+        root.after(100, _finish_closing)
+        return
+    if _STREAM is not None:
+        _STREAM.close()
+    _PA.terminate()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", close_tuner)
+
 root.mainloop()
\ No newline at end of file